@@ -1,9 +1,39 @@
-import hashlib
+from __future__ import annotations
+
+import os, hashlib, mmap
+from contextlib import contextmanager
+from pathlib import Path
+
+CHUNK_SIZE = 1 << 20
 
 class Blob:
-    def __init__(self, content: bytes):
-        self.content = content
+    def __init__(self, content: bytes | Path):
+        if isinstance(content, Path):
+            self.path = content
+            self.content = None
+        else:
+            self.path = None
+            self.content = content
+
         self.hash = self.compute_hash()
 
+    # the mapping and its size come from one open fd, so everything done
+    # inside a single data() block sees the same bytes
+    @contextmanager
+    def data(self):
+        if self.path is None:
+            yield self.content
+            return
+
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b""
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+
+    # hashlib's OpenSSL-backed sha1 already uses SHA-NI when the CPU has it
     def compute_hash(self):
-        return hashlib.sha1(self.content).hexdigest()
+        with self.data() as buf:
+            return hashlib.sha1(buf).hexdigest()
@@ -80,8 +80,7 @@ def main():
                 print('VC Repository already exists')
                 return
             
-            for path in args.paths:
-                vc_repository.add(path)
+            vc_repository.add(*args.paths)
                 
         elif args.command == 'rm':
             if not vc_repository.vc_dir_path.exists():
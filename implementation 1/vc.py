@@ -1,11 +1,52 @@
-import os, json, hashlib, zlib
+import os, json, hashlib, shutil, tempfile, zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from blob import Blob
+from blob import Blob, CHUNK_SIZE
+
+try:
+    import deflate
+except ImportError:
+    deflate = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# libdeflate would take levels up to 12, but blobs over CHUNK_SIZE go
+# through zlib, so the level is held to zlib's -1..9 for both
+def _compress_level(value: str) -> int:
+    try:
+        level = int(value)
+    except ValueError:
+        raise SystemExit(f"VC Error: VC_LEVEL must be an integer from -1 to 9, got {value!r}")
+
+    return max(-1, min(level, 9))
+
+VC_COMPRESS_LEVEL = _compress_level(os.environ.get("VC_LEVEL", "1"))
+
+# already-compressed formats (PNG, JPEG, ZIP, gzip) are stored raw behind
+# RAW_BLOB_MARKER, which can never start a zlib stream
+INCOMPRESSIBLE_MAGIC = (b"\x89PNG", b"\xff\xd8\xff", b"PK\x03\x04", b"\x1f\x8b")
+RAW_BLOB_MARKER = b"\x00"
+
+# recorded in index.json once blobs/ uses the aa/rest layout
+BLOB_LAYOUT = "sharded"
+
+MAX_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+
+# macOS has no fdatasync
+_fdatasync = getattr(os, "fdatasync", os.fsync)
+
+# mkstemp files start out 0600; stored blobs get the usual 0666 & ~umask
+_UMASK = os.umask(0)
+os.umask(_UMASK)
 
 class VersionControl:
     def __init__(self):
         self.path = Path('.').resolve()
+        self.root_prefix = str(self.path) + os.sep
         self.vc_dir_path = self.path / '.vc'
         self.blob_path = self.vc_dir_path / 'blobs'
         self.commit_tree_path = self.vc_dir_path / 'commit_tree'
@@ -14,6 +55,8 @@ class VersionControl:
         self.commit_list = self.vc_dir_path / 'commit_list.json'
         self.index = self.vc_dir_path / 'index.json'
 
+        self._blob_layout_checked = False
+
     def init(self) -> bool:
         if self.vc_dir_path.exists():
             return False
@@ -23,42 +66,89 @@ class VersionControl:
         os.mkdir(self.blob_path)
         os.mkdir(self.commit_tree_path)
 
-        with open(self.stage_path, "w") as f:
-            json.dump({}, f, indent=4)
-        with open(self.commit_list, "w") as f:
-            json.dump({}, f, indent=4)
-        with open(self.index, "w") as f:
-            json.dump(
-                {
-                    "current_branch": "master",
-                    "current_commit": "",
-                    "branches": { "master": "" },
-                    "current_snapshot": {}
-                },
-                f,
-                indent=4
-            )
+        self.write_json(self.stage_path, {})
+        self.write_json(self.commit_list, {})
+        self.write_json(
+            self.index,
+            {
+                "current_branch": "master",
+                "current_commit": "",
+                "branches": { "master": "" },
+                "current_snapshot": {},
+                "file_stats": {},
+                "blob_layout": BLOB_LAYOUT
+            }
+        )
         
         print(f'Initialized version control directory in {self.vc_dir_path}')
             
         return True
     
 
+    def read_json(self, path: Path) -> any:
+        if orjson is not None:
+            return orjson.loads(path.read_bytes())
+
+        return json.loads(path.read_bytes())
+
+
+    # git's racily-clean rule: a file stat is only trusted while its mtime
+    # is older than the index write that recorded it, as a same-size change
+    # in that same clock tick keeps the mtime. Such entries are dropped on
+    # load, so they are rehashed and never carried into a later rewrite
+    def load_index(self) -> dict:
+        with open(self.index, "rb") as f:
+            index_mtime = os.fstat(f.fileno()).st_mtime_ns
+            data = f.read()
+
+        head = orjson.loads(data) if orjson is not None else json.loads(data)
+
+        file_stats = head.get("file_stats")
+        if file_stats:
+            head["file_stats"] = {
+                path: stat for path, stat in file_stats.items()
+                if stat.get("mtime", index_mtime) < index_mtime
+            }
+
+        return head
+
+
+    # write to a temp file and rename it over the target, so a crash
+    # leaves either the old or the new file, never a truncated one
+    def _atomic_write(self, path: Path, data: bytes) -> None:
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            _fdatasync(f.fileno())
+
+        os.replace(tmp_path, path)
+
+
+    def write_json(self, path: Path, obj) -> None:
+        if orjson is not None:
+            data = orjson.dumps(obj)
+        else:
+            data = json.dumps(obj, separators=(",", ":")).encode()
+
+        self._atomic_write(path, data)
+
+
     def load_stage(self) -> any:
         if os.path.exists(self.stage_path):
-            with open(self.stage_path, "r") as f:
-                return json.load(f)
+            return self.read_json(self.stage_path)
 
         return {}
 
 
     def save_stage(self, stage_tree) -> None:
-        with open(self.stage_path, "w") as f:
-            json.dump(stage_tree, f, indent=4)
+        self.write_json(self.stage_path, stage_tree)
 
 
-    def insert_stage(self, path: str, hash: str) -> None:
-        index = self.load_stage()
+    def insert_stage(self, path: str, hash: str, index: dict = None) -> None:
+        # callers staging many paths pass a loaded stage and save it once
+        save = index is None
+        if save:
+            index = self.load_stage()
         
         if not isinstance(path, str):
             path = path.as_posix()
@@ -71,60 +161,242 @@ class VersionControl:
 
         curr[parts[-1]] = hash
         
-        self.save_stage(index)
+        if save:
+            self.save_stage(index)
+
+
+    # string slicing instead of Path.relative_to, paths are always under self.path
+    def _rel_path(self, path) -> str:
+        return str(path)[len(self.root_prefix):].replace(os.sep, "/")
+
+
+    # normpath is purely lexical, unlike resolve() it makes no syscalls
+    def _repo_path(self, path: str) -> Path:
+        full_path = os.path.normpath(self.path / path)
+
+        if not (full_path + os.sep).startswith(self.root_prefix):
+            raise ValueError(f"{path} is outside the repository.")
+
+        return Path(full_path)
+
+
+    def blob_file(self, hash: str) -> Path:
+        return self.blob_path / hash[:2] / hash[2:]
+
+
+    # blobs used to live flat in blobs/; repositories without the layout
+    # marker get them moved into their prefix dirs once, before the first
+    # command that reads or writes blobs
+    def migrate_blobs(self) -> None:
+        if self._blob_layout_checked:
+            return
+        self._blob_layout_checked = True
+
+        head = self.load_index()
+        if head.get("blob_layout") == BLOB_LAYOUT:
+            return
+
+        with os.scandir(self.blob_path) as it:
+            flat_blobs = [entry.name for entry in it if entry.is_file()]
+
+        for hash in flat_blobs:
+            blob_file_path = self.blob_file(hash)
+            blob_file_path.parent.mkdir(exist_ok=True)
+            os.replace(self.blob_path / hash, blob_file_path)
+
+        head["blob_layout"] = BLOB_LAYOUT
+        self.write_json(self.index, head)
+
+
+    # blobs are written to a unique temp file and hard-linked into place, so
+    # a blob path only ever holds a complete blob; EEXIST from the link means
+    # the same content is already stored
+    def _link_into_place(self, tmp_path: str, path: Path) -> bool:
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            return False
+        finally:
+            os.unlink(tmp_path)
+
+        return True
 
 
     def store_blob(self, blob: Blob) -> bool:
-        hash = blob.hash
-        
-        blob_file_path = self.blob_path / hash
-        
-        if not blob_file_path.exists():
-            content = zlib.compress(blob.content)
-            blob_file_path.write_bytes(content)
-            
-            return True
+        blob_file_path = self.blob_file(blob.hash)
 
-        return False
- 
+        # saves compressing content that is already stored; the link decides
+        if blob_file_path.exists():
+            return False
 
-    def add_file(self, file_to_add) -> None:
-        content = file_to_add.read_bytes()
+        blob_file_path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=blob_file_path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f, blob.data() as buf:
+                hash = self._write_blob(buf, f)
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        # the blob is named by the bytes actually written, which differ from
+        # what Blob hashed if the file changed in between
+        if hash != blob.hash:
+            blob.hash = hash
+            blob_file_path = self.blob_file(hash)
+            blob_file_path.parent.mkdir(exist_ok=True)
+
+        return self._link_into_place(tmp_path, blob_file_path)
+
+
+    # hashes each chunk as it is written, so the returned hash is of exactly
+    # the bytes stored even if the mapped file changes underneath
+    def _write_blob(self, buf, f) -> str:
+        hasher = hashlib.sha1()
+
+        if buf[:4].startswith(INCOMPRESSIBLE_MAGIC):
+            f.write(RAW_BLOB_MARKER)
+            for offset in range(0, len(buf), CHUNK_SIZE):
+                chunk = buf[offset : offset + CHUNK_SIZE]
+                hasher.update(chunk)
+                f.write(chunk)
+
+        elif deflate is not None and len(buf) <= CHUNK_SIZE:
+            content = bytes(buf)
+            hasher.update(content)
+            f.write(deflate.zlib_compress(content, VC_COMPRESS_LEVEL))
         
-        blob = Blob(content)
+        else:
+            compressor = zlib.compressobj(VC_COMPRESS_LEVEL)
+            for offset in range(0, len(buf), CHUNK_SIZE):
+                chunk = buf[offset : offset + CHUNK_SIZE]
+                hasher.update(chunk)
+                f.write(compressor.compress(chunk))
+            f.write(compressor.flush())
+
+        return hasher.hexdigest()
+
+
+    def file_stat(self, path: Path, hash: str) -> dict:
+        st = os.stat(path)
+        return {
+            "hash": hash,
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "ctime": st.st_ctime_ns,
+            "inode": st.st_ino,
+        }
+
+
+    def update_file_stats(self, file_stats: dict) -> None:
+        head = self.load_index()
+        head.setdefault("file_stats", {}).update(file_stats)
+
+        self.write_json(self.index, head)
 
-        if self.store_blob(blob):
+
+    def stage_blob(self, blob: Blob, stored: bool, index: dict = None) -> bool:
+        file_to_add = blob.path
+
+        if stored:
             hash = blob.hash
-            rel_path = file_to_add.relative_to(self.path).as_posix()
-            self.insert_stage(rel_path, hash)
+            rel_path = self._rel_path(file_to_add)
+            self.insert_stage(rel_path, hash, index=index)
             
             print(f"+ File: {file_to_add}")    
         
         else:
             print(f"File: {file_to_add} is already added.")
 
+        return stored
+
+
+    def add_file(self, file_to_add, stage: dict, file_stats: dict) -> None:
+        blob = Blob(file_to_add)
+
+        if self.stage_blob(blob, self.store_blob(blob), index=stage):
+            rel_path = self._rel_path(file_to_add)
+            file_stats[rel_path] = self.file_stat(file_to_add, blob.hash)
+
+
+    def _walk(self, root):
+        stack = [root]
+        while stack:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.name == ".vc":
+                        continue
+
+                    # DirEntry type checks come from readdir's d_type, no stat needed
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+
+
+    def add_dir(self, dir_to_add, stage: dict, file_stats: dict) -> None:
+        # reading in inode order keeps disk access close to sequential on a cold cache
+        entries = sorted(self._walk(dir_to_add), key=lambda entry: entry.inode())
+        files = [Path(entry.path) for entry in entries]
+
+        # reading, hashing, compressing and writing all release the GIL,
+        # so files are processed concurrently and staged afterwards in walk order
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            blobs = list(executor.map(Blob, files))
+
+            # only the first file with given content may create its blob,
+            # as it would when adding serially
+            first_blobs = {}
+            for blob in blobs:
+                first_blobs.setdefault(blob.hash, blob)
 
-    def add_dir(self, dir_to_add) -> None:
-        for path in dir_to_add.rglob("*"):
-            if path.is_file():
-                self.add_file(path)
+            # keyed by blob, as store_blob may rehash a file that changed
+            firsts = list(first_blobs.values())
+            stored = {id(blob) for blob, new in zip(firsts, executor.map(self.store_blob, firsts)) if new}
+
+        for blob in blobs:
+            if self.stage_blob(blob, id(blob) in stored, index=stage):
+                rel_path = self._rel_path(blob.path)
+                file_stats[rel_path] = self.file_stat(blob.path, blob.hash)
 
 
     # add
-    def add(self, path_to_add: str) -> None:
-        path_to_add = self.path / path_to_add
-        
-        if not path_to_add.exists():
-            raise FileNotFoundError(f"Path {path_to_add} does not exists.")
-        
-        if path_to_add.is_file():
-            self.add_file(path_to_add)
+    def add(self, *paths_to_add: str) -> None:
+        self.migrate_blobs()
 
-        elif path_to_add.is_dir():
-            self.add_dir(path_to_add)
+        # the stage and the file stats are loaded and written once for all
+        # paths; whatever was staged before a bad path is still saved
+        stage = self.load_stage()
+        file_stats = {}
 
-        else:
-            raise ValueError(f"{path_to_add} is neither a file nor a directory.")
+        try:
+            for path_to_add in paths_to_add:
+                path_to_add = self._repo_path(path_to_add)
+                
+                if not path_to_add.exists():
+                    raise FileNotFoundError(f"Path {path_to_add} does not exists.")
+                
+                if path_to_add.is_file():
+                    self.add_file(path_to_add, stage, file_stats)
+
+                elif path_to_add.is_dir():
+                    self.add_dir(path_to_add, stage, file_stats)
+
+                else:
+                    raise ValueError(f"{path_to_add} is neither a file nor a directory.")
+
+        finally:
+            if file_stats:
+                self.save_stage(stage)
+                self.update_file_stats(file_stats)
+
+
+    # snapshots are flat {path: blob hash} dicts; ones written by older
+    # versions are nested like commit trees
+    def _flat_snapshot(self, snapshot):
+        if any(isinstance(val, dict) for val in snapshot.values()):
+            return self._flatten_entries(snapshot)
+        return snapshot
 
 
     def build_snapshot(self, commits, commit_hash):
@@ -132,33 +404,50 @@ class VersionControl:
         chain = []
         cur = commit_hash
         while cur:
+            snapshot_file = self.commit_tree_path / f"{cur}.snap.json"
+            if snapshot_file.exists():
+                snapshot = self._flat_snapshot(self.read_json(snapshot_file))
+                break
+
             chain.append(cur)
             cur = commits[cur]["parent"]
 
+        if not chain:
+            return snapshot
+
         chain.reverse()
 
         for cid in chain:
             tree_hash = commits[cid]["tree"]
             tree_file = self.commit_tree_path / f"{tree_hash}.json"
             if tree_file.exists():
-                subtree = json.loads(tree_file.read_text())
-                self.deep_merge(snapshot, subtree)
+                subtree = self.read_json(tree_file)
+                self.apply_tree(snapshot, self._flatten_entries(subtree))
+
+        # cache the full snapshot so later builds only replay newer commits
+        self.write_json(self.commit_tree_path / f"{commit_hash}.snap.json", snapshot)
 
         return snapshot
     
     
-    def deep_merge(self, base, new):
-        for key, val in new.items():
-            if val == "__deleted__":
-                if key in base:
-                    del base[key]
-                continue
-        
-            if isinstance(val, dict):
-                base[key] = self.deep_merge(base.get(key, {}), val)
+    def apply_tree(self, snapshot, flat_tree):
+        for path, hash in flat_tree.items():
+            if hash == "__deleted__":
+                snapshot.pop(path, None)
             else:
-                base[key] = val
-        return base
+                snapshot[path] = hash
+        return snapshot
+
+
+    # hashes (path, blob hash) pairs in path order without building the JSON text
+    def tree_hash(self, flat_tree: dict) -> str:
+        hasher = hashlib.sha1()
+        for path in sorted(flat_tree):
+            hasher.update(path.encode())
+            hasher.update(b"\0")
+            hasher.update(flat_tree[path].encode())
+            hasher.update(b"\n")
+        return hasher.hexdigest()
 
 
     # commit
@@ -169,24 +458,27 @@ class VersionControl:
             print("Nothing to commit.")
             return
         
-        stage_bytes = json.dumps(stage, sort_keys=True).encode()
-        
-        tree_hash = hashlib.sha1(stage_bytes).hexdigest()
+        tree_hash = self.tree_hash(self._flatten_entries(stage))
+
+        head = self.load_index() if self.index.exists() else {
+            "current_commit": "",
+            "current_snapshot": {}
+        }
+
+        # re-committing the tree of the current commit would change nothing
+        if tree_hash == head.get("current_commit_tree"):
+            self.save_stage({})
+            print("Nothing to commit.")
+            return
         
         tree_path = self.commit_tree_path / f"{tree_hash}.json"
         if not tree_path.exists():
-            with open(tree_path, "w") as f:
-                json.dump(stage, f, indent=4)
+            self.write_json(tree_path, stage)
 
         if self.commit_list.exists():
-            commits = json.loads(self.commit_list.read_text())
+            commits = self.read_json(self.commit_list)
         else:
             commits = {}
-
-        head = json.loads(self.index.read_text()) if self.index.exists() else {
-            "current_commit": "",
-            "current_snapshot": {}
-        }
         
         parent_commit = head.get("current_commit", "")
         
@@ -202,8 +494,6 @@ class VersionControl:
         commit_hash = hashlib.sha1(commit_bytes).hexdigest()
         
         commits[commit_hash] = commit_obj
-        with open(self.commit_list, "w") as f:
-            json.dump(commits, f, indent=4)
         
         new_snapshot = self.build_snapshot(commits, commit_hash)
         
@@ -214,10 +504,11 @@ class VersionControl:
             head["branches"] = branches
         
         head["current_commit"] = commit_hash
+        head["current_commit_tree"] = tree_hash
         head["current_snapshot"] = new_snapshot
         
-        with open(self.index, "w") as f:
-            json.dump(head, f, indent=4)
+        self.write_json(self.commit_list, commits)
+        self.write_json(self.index, head)
 
         self.save_stage({})
 
@@ -226,18 +517,22 @@ class VersionControl:
     
     # rm
     def rm(self, path: str):
-        file_path = (self.path / path).resolve()
+        file_path = self._repo_path(path)
 
         if not file_path.exists():
             raise FileNotFoundError(f"{path} does not exist.")
 
-        rel_path = file_path.relative_to(self.path).as_posix()
+        rel_path = self._rel_path(file_path)
         
         file_path.unlink()
         print(f"Removed file: {path}")
 
         self.insert_stage(rel_path, "__deleted__")
 
+        head = self.load_index()
+        if head.get("file_stats", {}).pop(rel_path, None) is not None:
+            self.write_json(self.index, head)
+
         print(f"- Deleted: {path}")
     
         
@@ -247,7 +542,7 @@ class VersionControl:
             print("Repository not initialized.")
             return
 
-        head = json.loads(self.index.read_text())
+        head = self.load_index()
         current_commit = head["current_commit"]
 
         branches = head.get("branches", {})
@@ -259,14 +554,13 @@ class VersionControl:
         branches[name] = current_commit
         head["branches"] = branches
 
-        with open(self.index, "w") as f:
-            json.dump(head, f, indent=4)
+        self.write_json(self.index, head)
 
         print(f"Branch '{name}' created at {current_commit}")
     
     
     def list_branches(self) -> None:
-        head = json.loads(self.index.read_text())
+        head = self.load_index()
         branches = head.get("branches", {})
         current = head.get("current_branch")
 
@@ -275,30 +569,57 @@ class VersionControl:
             print(f"{star} {br}")
     
     
-    def restore_from_snapshot(self, tree: dict, root: Path):
-        for name, val in tree.items():
-            dest = root / name
+    def restore_blob(self, hash: str, dest: Path) -> None:
+        with open(self.blob_file(hash), "rb") as src, open(dest, "wb") as out:
+            if src.read(1) == RAW_BLOB_MARKER:
+                shutil.copyfileobj(src, out, CHUNK_SIZE)
+                return
 
-            if isinstance(val, dict):
-                dest.mkdir(exist_ok=True)
-                self.restore_from_snapshot(val, dest)
-            else:
-                blob_path = self.blob_path / val
-                content = zlib.decompress(blob_path.read_bytes())
-                dest.parent.mkdir(parents=True, exist_ok=True)
-                dest.write_bytes(content)
+            src.seek(0)
+            decompressor = zlib.decompressobj()
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                out.write(decompressor.decompress(chunk))
+            out.write(decompressor.flush())
+
+
+    def restore_blob_to(self, hash: str, dests: list) -> None:
+        self.restore_blob(hash, dests[0])
+
+        for dest in dests[1:]:
+            shutil.copyfile(dests[0], dest)
+
+
+    def restore_from_snapshot(self, snapshot: dict, root: Path):
+        # create every directory once up front, shallowest first, so file
+        # restores need no per-file parent mkdir
+        dirs = {os.path.dirname(rel_path) for rel_path in snapshot} - {""}
+        for rel_dir in sorted(dirs, key=len):
+            os.makedirs(root / rel_dir, exist_ok=True)
+
+        # each distinct blob is inflated once, paths sharing it get a file copy
+        dests_by_hash = {}
+        for rel_path, hash in snapshot.items():
+            dests_by_hash.setdefault(hash, []).append(root / rel_path)
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            list(executor.map(lambda item: self.restore_blob_to(*item), dests_by_hash.items()))
 
 
     def clear_working_directory(self):
-        for path in self.path.rglob("*"):
-            if ".vc" in path.parts:
+        # bottom-up, so every directory is already empty when it is removed
+        for root, dirs, files in os.walk(self.path, topdown=False):
+            if ".vc" in self._rel_path(root).split("/"):
                 continue
 
-            if path.is_file():
-                path.unlink()
-            elif path.is_dir():
+            for name in files:
+                os.unlink(os.path.join(root, name))
+
+            for name in dirs:
+                if name == ".vc":
+                    continue
+
                 try:
-                    path.rmdir()
+                    os.rmdir(os.path.join(root, name))
                 except OSError:
                     pass
     
@@ -307,7 +628,7 @@ class VersionControl:
         if not self.index.exists():
             return []
 
-        head = json.loads(self.index.read_text())
+        head = self.load_index()
         branches = head.get("branches", {})
 
         return list(branches.keys())
@@ -315,7 +636,9 @@ class VersionControl:
     
     # checkout branch
     def checkout_branch(self, name: str):
-        head = json.loads(self.index.read_text())
+        self.migrate_blobs()
+
+        head = self.load_index()
         branches = head.get("branches", {})
 
         if name not in branches:
@@ -324,7 +647,7 @@ class VersionControl:
 
         commit_hash = branches[name]
 
-        commits = json.loads(self.commit_list.read_text())
+        commits = self.read_json(self.commit_list)
 
         snapshot = self.build_snapshot(commits, commit_hash)
 
@@ -333,17 +656,25 @@ class VersionControl:
 
         head["current_branch"] = name
         head["current_commit"] = commit_hash
+        head["current_commit_tree"] = commits[commit_hash]["tree"] if commit_hash else ""
         head["current_snapshot"] = snapshot
 
-        with open(self.index, "w") as f:
-            json.dump(head, f, indent=4)
+        # stats of files the checkout removed would otherwise pile up
+        head["file_stats"] = {
+            path: stat for path, stat in head.get("file_stats", {}).items()
+            if path in snapshot
+        }
+
+        self.write_json(self.index, head)
 
         print(f"Switched to branch '{name}'")
     
     
     # checkout commit
     def checkout_commit(self, commit_hash: str):
-        commits = json.loads(self.commit_list.read_text())
+        self.migrate_blobs()
+
+        commits = self.read_json(self.commit_list)
 
         if commit_hash not in commits:
             print(f"Commit '{commit_hash}' does not exist.")
@@ -354,7 +685,7 @@ class VersionControl:
         self.clear_working_directory()
         self.restore_from_snapshot(snapshot, self.path)
 
-        head = json.loads(self.index.read_text())
+        head = self.load_index()
 
         branch_attached = None
         for br, h in head.get("branches", {}).items():
@@ -364,10 +695,15 @@ class VersionControl:
 
         head["current_branch"] = branch_attached
         head["current_commit"] = commit_hash
+        head["current_commit_tree"] = commits[commit_hash]["tree"] if commit_hash else ""
         head["current_snapshot"] = snapshot
 
-        with open(self.index, "w") as f:
-            json.dump(head, f, indent=4)
+        head["file_stats"] = {
+            path: stat for path, stat in head.get("file_stats", {}).items()
+            if path in snapshot
+        }
+
+        self.write_json(self.index, head)
 
         if branch_attached:
             print(f"Switched to branch '{branch_attached}'")
@@ -381,8 +717,8 @@ class VersionControl:
             print("No commits.")
             return
 
-        commits = json.loads(self.commit_list.read_text())
-        head = json.loads(self.index.read_text())
+        commits = self.read_json(self.commit_list)
+        head = self.load_index()
         cur = head.get("current_commit", "")
 
         if not cur:
@@ -400,24 +736,26 @@ class VersionControl:
             cur = c["parent"]
 
     
-    def _flatten_tree(self, tree, prefix=""):
-        paths = []
+    def _flatten_entries(self, tree, prefix=""):
+        entries = {}
         for key, val in tree.items():
             new = f"{prefix}/{key}" if prefix else key
             if isinstance(val, dict):
-                paths.extend(self._flatten_tree(val, new))
+                entries.update(self._flatten_entries(val, new))
             else:
-                paths.append(new)
-        return paths
+                entries[new] = val
+        return entries
+
+
+    def _flatten_tree(self, tree, prefix=""):
+        return list(self._flatten_entries(tree, prefix))
     
     
+    # in inode order, which keeps later stats and reads close to on-disk order
     def _list_working_files(self):
         files = []
-        for p in self.path.rglob("*"):
-            if ".vc" in p.parts:
-                continue
-            if p.is_file():
-                files.append(p.relative_to(self.path).as_posix())
+        for entry in sorted(self._walk(self.path), key=lambda entry: entry.inode()):
+            files.append(self._rel_path(entry.path))
         return files
     
     
@@ -431,27 +769,18 @@ class VersionControl:
         return curr.get(parts[-1]) == "__deleted__"
     
     
-    def _get_hash_from_snapshot(self, tree, rel_path):
-        parts = rel_path.split("/")
-        curr = tree
-
-        for p in parts[:-1]:
-            if p not in curr:
-                return None
-            curr = curr[p]
-
-        return curr.get(parts[-1])
-    
-    
     # status
     def status(self):
-        head = json.loads(self.index.read_text())
-        snapshot = head.get("current_snapshot", {})
+        head = self.load_index()
+        snapshot = self._flat_snapshot(head.get("current_snapshot", {}))
+        file_stats = head.get("file_stats", {})
         staged = self.load_stage()
 
         staged_flat = set(self._flatten_tree(staged))
-        snapshot_flat = set(self._flatten_tree(snapshot))
-        working_files = set(self._list_working_files())
+        snapshot_flat = snapshot.keys()
+        working_list = self._list_working_files()
+        working_files = set(working_list)
+        inode_order = {p: i for i, p in enumerate(working_list)}
 
         print("\nChanges to be committed")
         if staged_flat:
@@ -467,18 +796,27 @@ class VersionControl:
         print("\nChanges not staged for commit")
         modified = []
         deleted = []
+        refreshed_stats = {}
 
-        for path in snapshot_flat:
+        for path in sorted(snapshot_flat, key=lambda p: inode_order.get(p, -1)):
             if path not in working_files and path not in staged_flat:
                 deleted.append(path)
             else:
                 if path in working_files:
-                    snap_hash = self._get_hash_from_snapshot(snapshot, path)
-                    blob_path = self.blob_path / snap_hash
-                    old_content = zlib.decompress(blob_path.read_bytes())
-                    new_content = (self.path / path).read_bytes()
+                    snap_hash = snapshot[path]
+
+                    # a file whose size, times and inode match what was
+                    # recorded for this content is unchanged without reading it
+                    stat = self.file_stat(self.path / path, snap_hash)
+                    if file_stats.get(path) == stat:
+                        continue
 
-                    if old_content != new_content and path not in staged_flat:
+                    # snapshot hashes are sha1 of the uncompressed content, so
+                    # streaming-hash the working file instead of loading both
+                    if Blob(self.path / path).hash == snap_hash:
+                        refreshed_stats[path] = stat
+
+                    elif path not in staged_flat:
                         modified.append(path)
 
         if modified or deleted:
@@ -489,6 +827,9 @@ class VersionControl:
         else:
             print("(no changes)")
 
+        if refreshed_stats:
+            self.update_file_stats(refreshed_stats)
+
 
         print("\nUntracked files")
         untracked = working_files - snapshot_flat - staged_flat
@@ -1,13 +1,42 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import json, time
+import os, json, time, functools, hashlib, mmap, stat, struct, tempfile, threading
 from typing import Dict, List
 
-from vc_objects import VCObject, Blob, Tree, Commit
+from vc_objects import VCObject, Blob, Tree, Commit, Mode, CHUNK_SIZE
+
+# macOS has no fdatasync
+_fdatasync = getattr(os, "fdatasync", os.fsync)
+
+# mkstemp files start out 0600; objects and new restored files get the
+# usual 0666 & ~umask
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+MAX_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+
+OBJECT_CACHE_BYTES = 64 << 20
+TREE_CACHE_SIZE = 4096
+
+# the index is INDEX_MAGIC followed by back-to-back records: mtime_ns,
+# ctime_ns, size, inode, raw sha1 and path length, then the utf-8 path
+INDEX_MAGIC = b"VCIX"
+INDEX_ENTRY = struct.Struct("<QQQQ20sH")
 
 class VersionControl:
-    def __init__(self, path='.'):
+    def __init__(self, path='.', object_cache_bytes: int = OBJECT_CACHE_BYTES):
         self.path = Path(path).resolve()
 
+        # objects are immutable, so loaded ones are shared for the life of
+        # this instance: raw objects in an LRU bounded by their total content
+        # size (0 turns it off), parsed trees in an lru_cache
+        self._object_cache = OrderedDict()
+        self._object_cache_bytes = 0
+        self._object_cache_limit = object_cache_bytes
+        self._object_cache_lock = threading.Lock()
+        self._load_tree = functools.lru_cache(maxsize=TREE_CACHE_SIZE)(self._read_tree)
+
         self.vc_dir = self.path / '.vc'
 
         self.objects_dir = self.vc_dir / 'objects'
@@ -28,7 +57,7 @@ class VersionControl:
         self.refs_dir.mkdir()
         self.heads_dir.mkdir()
         self.head_file.write_text("ref: refs/heads/master")
-        self.index_file.write_text(json.dumps({}, indent=2))
+        self.save_index({})
         print(f'Initialized version control directory in {self.vc_dir}')
         
         return True
@@ -39,37 +68,159 @@ class VersionControl:
         obj_dir = self.objects_dir / obj_hash[:2]
         obj_file = obj_dir / obj_hash[2:]
 
-        if not obj_file.exists():
-            obj_dir.mkdir(exist_ok=True)
-            obj_file.write_bytes(obj.serialize())
+        # saves compressing content that is already stored; the link decides
+        if obj_file.exists():
+            return obj_hash
 
+        obj_dir.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=obj_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                written_hash = obj.write_to(f.write).hex()
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        # the object is named by the bytes actually written, which differ
+        # from the earlier hash() if a blob's file changed in between
+        if written_hash != obj_hash:
+            obj_hash = written_hash
+            obj_file = self.objects_dir / obj_hash[:2] / obj_hash[2:]
+            obj_file.parent.mkdir(exist_ok=True)
+
+        self._link_into_place(tmp_path, obj_file)
         return obj_hash
+
+
+    # objects are written to a unique temp file and hard-linked into place,
+    # so an object path only ever holds a complete object; EEXIST from the
+    # link means the same content is already stored
+    def _link_into_place(self, tmp_path: str, path: Path) -> bool:
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            return False
+        finally:
+            os.unlink(tmp_path)
+
+        return True
     
 
-    def load_index(self) -> Dict[str, str]:
+    def load_index(self) -> Dict[str, Dict]:
         if not self.index_file.exists():
             return {}
 
         try:
-            return json.loads(self.index_file.read_text())
+            with open(self.index_file, "rb") as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data[:len(INDEX_MAGIC)] == INDEX_MAGIC:
+                    return self._unpack_index(data)
+
+                index = json.loads(data[:])
         except:
             return {}
+
+        # older indexes are json, mapping paths straight to hex blob hashes
+        return {
+            path: {"hash": bytes.fromhex(entry["hash"] if isinstance(entry, dict) else entry)}
+            for path, entry in index.items()
+        }
+
+
+    def _unpack_index(self, data) -> Dict[str, Dict]:
+        index = {}
+        unpack_from = INDEX_ENTRY.unpack_from
+        offset = len(INDEX_MAGIC)
+        end = len(data)
+
+        while offset < end:
+            mtime_ns, ctime_ns, size, inode, raw_hash, path_len = unpack_from(data, offset)
+            offset += INDEX_ENTRY.size
+            path = data[offset:offset + path_len].decode()
+            offset += path_len
+
+            # entries migrated from a json index carry no stat data
+            if inode:
+                index[path] = {
+                    "hash": raw_hash,
+                    "mtime_ns": mtime_ns,
+                    "ctime_ns": ctime_ns,
+                    "size": size,
+                    "inode": inode,
+                }
+            else:
+                index[path] = {"hash": raw_hash}
+
+        return index
+
+
+    # same digest as Blob(path).digest(), streamed through OpenSSL;
+    # hashlib.file_digest is 3.11+, older interpreters read into one buffer
+    def file_hash(self, path: str, size: int) -> bytes:
+        header = f"blob {size}\0".encode()
+        with open(path, 'rb', buffering=0) as f:
+            if hasattr(hashlib, "file_digest"):
+                return hashlib.file_digest(f, lambda: hashlib.sha1(header)).digest()
+
+            h = hashlib.sha1(header)
+            buf = bytearray(CHUNK_SIZE)
+            view = memoryview(buf)
+            while n := f.readinto(buf):
+                h.update(view[:n])
+            return h.digest()
+
+
+    # stat fields cached per index entry, so status can tell an unchanged
+    # file without reading and hashing it
+    def index_entry(self, blob_hash: bytes, st: os.stat_result) -> Dict:
+        return {
+            "hash": blob_hash,
+            "mtime_ns": st.st_mtime_ns,
+            "ctime_ns": st.st_ctime_ns,
+            "size": st.st_size,
+            "inode": st.st_ino,
+        }
     
 
-    def save_index(self, index: Dict[str, str]):
-        self.index_file.write_text(json.dumps(index, indent=2))
+    # write to a temp file and rename it over the target, so a crash
+    # leaves either the old or the new file, never a truncated one
+    def _atomic_write(self, path: Path, data: bytes):
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            _fdatasync(f.fileno())
+
+        os.replace(tmp_path, path)
+
+
+    def save_index(self, index: Dict[str, Dict]):
+        pack = INDEX_ENTRY.pack
+        parts = [INDEX_MAGIC]
+
+        for path, entry in index.items():
+            name = path.encode()
+            parts.append(pack(
+                entry.get("mtime_ns", 0),
+                entry.get("ctime_ns", 0),
+                entry.get("size", 0),
+                entry.get("inode", 0),
+                entry["hash"],
+                len(name),
+            ))
+            parts.append(name)
+
+        self._atomic_write(self.index_file, b"".join(parts))
 
 
     def add_file(self, path: str):
         full_path = self.path / path
         
-        content = full_path.read_bytes()
-        
-        blob = Blob(content)
-        blob_hash = self.store_object(blob)
+        blob = Blob(full_path)
+        self.store_object(blob)
 
         index = self.load_index()
-        index[path] = blob_hash
+        index[path] = self.index_entry(blob.digest(), full_path.stat())
         self.save_index(index)
 
         print(f"Added {path}")
@@ -79,22 +230,19 @@ class VersionControl:
         full_path = self.path / path
         index = self.load_index()
         
-        added_count = 0
+        files = [Path(entry.path) for entry in self._walk(full_path)]
+        blobs = [Blob(file_path) for file_path in files]
+
+        # read, hash, compress and write release the GIL, so objects are
+        # stored concurrently; the index is only touched from this thread
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            list(executor.map(self.store_object, blobs))
+
+        for file_path, blob in zip(files, blobs):
+            rel_path = str(file_path.relative_to(self.path))
+            index[rel_path] = self.index_entry(blob.digest(), file_path.stat())
         
-        for file_path in full_path.rglob("*"):
-            if file_path.is_file():
-                if ".vc" in file_path.parts:
-                    continue
-                
-                content = file_path.read_bytes()
-                
-                blob = Blob(content)
-                blob_hash = self.store_object(blob)
-                
-                rel_path = str(file_path.relative_to(self.path))
-                index[rel_path] = blob_hash
-                
-                added_count += 1
+        added_count = len(files)
 
         self.save_index(index)
         
@@ -131,7 +279,8 @@ class VersionControl:
         dirs = {}
         files = {}
         
-        for file_path, blob_hash in index.items():
+        for file_path, entry in index.items():
+            blob_hash = entry["hash"]
             parts = file_path.split("/")
 
             if len(parts) == 1:
@@ -151,24 +300,25 @@ class VersionControl:
 
                 current[parts[-1]] = blob_hash
         
-        def create_tree_recursive(entries_dict: Dict):
+        def create_tree_recursive(entries_dict: Dict) -> Tree:
             tree = Tree()
 
             for name, blob_hash in entries_dict.items():
-                if isinstance(blob_hash, str):
-                    tree.add_entry("100644", name, blob_hash)
+                if isinstance(blob_hash, bytes):
+                    tree.add_entry(Mode.BLOB, name, blob_hash)
 
                 if isinstance(blob_hash, dict):
-                    subtree_hash = create_tree_recursive(blob_hash)
-                    tree.add_entry("40000", name, subtree_hash)
+                    subtree = create_tree_recursive(blob_hash)
+                    tree.add_entry(Mode.TREE, name, subtree.digest())
 
-            return self.store_object(tree)
+            self.store_object(tree)
+            return tree
 
         root_entries = {**files}
         for dir_name, dir_contents in dirs.items():
             root_entries[dir_name] = dir_contents
 
-        return create_tree_recursive(root_entries)
+        return create_tree_recursive(root_entries).hash()
     
 
     def get_current_branch(self) -> str:
@@ -194,10 +344,34 @@ class VersionControl:
     def set_branch_commit(self, current_branch: str, commit_hash: str):
         branch_file = self.heads_dir / current_branch
         
-        branch_file.write_text(commit_hash + "\n")
+        self._atomic_write(branch_file, (commit_hash + "\n").encode())
 
 
     def load_object(self, obj_hash: str) -> VCObject:
+        with self._object_cache_lock:
+            obj = self._object_cache.get(obj_hash)
+            if obj is not None:
+                self._object_cache.move_to_end(obj_hash)
+                return obj
+
+        obj = self._read_object(obj_hash)
+        size = len(obj.content)
+        if size > self._object_cache_limit:
+            return obj
+
+        with self._object_cache_lock:
+            if obj_hash not in self._object_cache:
+                self._object_cache[obj_hash] = obj
+                self._object_cache_bytes += size
+
+            while self._object_cache_bytes > self._object_cache_limit:
+                _, evicted = self._object_cache.popitem(last=False)
+                self._object_cache_bytes -= len(evicted.content)
+
+        return obj
+
+
+    def _read_object(self, obj_hash: str) -> VCObject:
         obj_dir = self.objects_dir / obj_hash[:2]
         obj_file = obj_dir / obj_hash[2:]
 
@@ -206,6 +380,19 @@ class VersionControl:
 
         return VCObject.deserialize(obj_file.read_bytes())
 
+
+    # cached per instance as _load_tree, and shared by every walk
+    def _read_tree(self, tree_hash: bytes) -> Tree:
+        return Tree.from_content(self._read_object(tree_hash.hex()).content)
+
+
+    def _try_load_tree(self, tree_hash: bytes):
+        try:
+            return self._load_tree(tree_hash)
+        except Exception as e:
+            print(f"Warning: Could not read tree {tree_hash.hex()}: {e}")
+            return None
+
         
     # commit
     def commit(self, message: str, author: str, email: str) -> str:
@@ -245,85 +432,138 @@ class VersionControl:
         return commit_hash
 
 
-    def get_files_from_tree_recursive(
-        self,
-        tree_hash: str,
-        prefix: str = "",
-    ):
-        files = set()
-        try:
-            tree_obj = self.load_object(tree_hash)
-            tree = Tree.from_content(tree_obj.content)
-            for mode, name, obj_hash in tree.entries:
-                full_name = f"{prefix}{name}"
-                if mode.startswith("100"):
-                    files.add(full_name)
-                elif mode.startswith("400"):
-                    subtree_files = self.get_files_from_tree_recursive(
-                        obj_hash, f"{full_name}/"
-                    )
-                    files.update(subtree_files)
-        except Exception as e:
-            print(f"Warning: Could not read tree {tree_hash}: {e}")
+    # breadth-first over the tree DAG, loading each level's subtrees concurrently
+    def _tree_blob_entries(self, tree_hash: bytes, prefix: str = "") -> Dict[str, bytes]:
+        blobs = {}
+        level = [(tree_hash, prefix)]
 
-        return files
-    
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            while level:
+                next_level = []
+                trees = executor.map(self._try_load_tree, [h for h, _ in level])
 
-    def restore_tree(self, tree_hash: str, path: Path):
-        tree_obj = self.load_object(tree_hash)
-        tree = Tree.from_content(tree_obj.content)
+                for (_, level_prefix), tree in zip(level, trees):
+                    if tree is None:
+                        continue
+
+                    for mode, name, obj_hash in tree.entries:
+                        full_name = f"{level_prefix}{name}"
+                        if stat.S_ISREG(mode):
+                            blobs[full_name] = obj_hash
+                        elif stat.S_ISDIR(mode):
+                            next_level.append((obj_hash, f"{full_name}/"))
+
+                level = next_level
+
+        return blobs
+
+
+    def _collect_tree_files(self, tree_hash: bytes, path: Path, dirs: List[Path], files: List):
+        tree = self._load_tree(tree_hash)
         for mode, name, obj_hash in tree.entries:
             file_path = path / name
-            if mode.startswith("100"):
-                blob_obj = self.load_object(obj_hash)
-                blob = Blob(blob_obj.content)
-                file_path.write_bytes(blob.content)
-            elif mode.startswith("400"):
-                file_path.mkdir(exist_ok=True)
-                self.restore_tree(obj_hash, file_path)
+            if stat.S_ISREG(mode):
+                files.append((file_path, obj_hash))
+            elif stat.S_ISDIR(mode):
+                dirs.append(file_path)
+                self._collect_tree_files(obj_hash, file_path, dirs, files)
+
+
+    def _restore_one_blob(self, item):
+        # each blob is written once, so it is not worth holding in the cache
+        file_path, obj_hash = item
+        blob_obj = self._read_object(obj_hash.hex())
+
+        # an existing file keeps its permissions, a new one gets 0666 & ~umask,
+        # as if it had been written in place
+        try:
+            mode = stat.S_IMODE(os.stat(file_path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+
+        # written to a unique file beside the target and renamed over it, so
+        # an interrupted restore never leaves a half-written file behind
+        fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=".vc-")
+        try:
+            try:
+                view = memoryview(blob_obj.content)
+                while view:
+                    view = view[os.write(fd, view[:CHUNK_SIZE]):]
+            finally:
+                os.close(fd)
+            os.chmod(tmp_path, mode)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        os.replace(tmp_path, file_path)
+
+
+    def _restore_files(self, dirs: List[Path], files: List):
+        # parents come before children in the walk, so one mkdir each suffices
+        for dir_path in dirs:
+            dir_path.mkdir(exist_ok=True)
+
+        # zlib decompression and file writes release the GIL
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            list(executor.map(self._restore_one_blob, files))
 
 
     def restore_working_directory(
         self,
         branch: str,
-        files_to_clear: set[str],
+        previous_files: Dict[str, bytes],
     ):
         target_commit_hash = self.get_branch_commit(branch)
         if not target_commit_hash:
             return
 
-        for rel_path in sorted(files_to_clear):
-            file_path = self.path / rel_path
-            try:
-                if file_path.is_file():
-                    file_path.unlink()
-            except Exception:
-                pass
-
         target_commit_obj = self.load_object(target_commit_hash)
         target_commit = Commit.from_content(target_commit_obj.content)
 
+        dirs = []
+        files = []
         if target_commit.tree_hash:
-            self.restore_tree(target_commit.tree_hash, self.path)
+            self._collect_tree_files(
+                bytes.fromhex(target_commit.tree_hash), self.path, dirs, files
+            )
+
+        # a file with the same blob on both branches is left in place: only
+        # paths leaving the tree are unlinked, only changed or missing written
+        root = str(self.path)
+        target_paths = set()
+        changed_files = []
+        for file_path, obj_hash in files:
+            rel_path = os.path.relpath(file_path, root)
+            target_paths.add(rel_path)
+            if previous_files.get(rel_path) != obj_hash or not file_path.exists():
+                changed_files.append((file_path, obj_hash))
+
+        for rel_path in previous_files.keys() - target_paths:
+            try:
+                os.unlink(os.path.join(root, rel_path))
+            except OSError:
+                pass
 
+        self._restore_files(dirs, changed_files)
         self.save_index({})
 
 
     # checkout
     def checkout(self, branch: str, create_branch: bool):
         previous_branch = self.get_current_branch()
-        files_to_clear = set()
+        previous_files = {}
         try:
             previous_commit_hash = self.get_branch_commit(previous_branch)
             if previous_commit_hash:
                 prev_commit_object = self.load_object(previous_commit_hash)
                 prev_commit = Commit.from_content(prev_commit_object.content)
                 if prev_commit.tree_hash:
-                    files_to_clear = self.get_files_from_tree_recursive(
-                        prev_commit.tree_hash
+                    previous_files = self.build_index_from_tree(
+                        bytes.fromhex(prev_commit.tree_hash)
                     )
         except Exception:
-            files_to_clear = set()
+            previous_files = {}
 
         branch_file = self.heads_dir / branch
         if not branch_file.exists():
@@ -340,9 +580,9 @@ class VersionControl:
                     "Use 'python3 main.py checkout -b {branch}' to create and switch to a new branch."
                 )
                 return
-        self.head_file.write_text(f"ref: refs/heads/{branch}\n")
+        self._atomic_write(self.head_file, f"ref: refs/heads/{branch}\n".encode())
 
-        self.restore_working_directory(branch, files_to_clear)
+        self.restore_working_directory(branch, previous_files)
         print(f"Switched to branch {branch}")
 
 
@@ -385,50 +625,45 @@ class VersionControl:
             print("No commits yet!")
             return
 
+        _print = print
+        ctime = time.ctime
+        parse_header = Commit.parse_header
+
         count = 0
         while commit_hash and count < max_count:
-            commit_obj = self.load_object(commit_hash)
-            commit = Commit.from_content(commit_obj.content)
+            content = self.load_object(commit_hash).content
+            header = parse_header(content)
+            message = content[header.message_offset:].decode()
 
-            print(f"commit {commit_hash}")
-            print(f"Author: {commit.author}")
-            print(f"Date: {time.ctime(commit.timestamp)}")
-            print(f"\n    {commit.message}\n")
+            _print(f"commit {commit_hash}")
+            _print(f"Author: {header.author}")
+            _print(f"Date: {ctime(header.timestamp)}")
+            _print(f"\n    {message}\n")
 
-            commit_hash = commit.parent_hashes[0] if commit.parent_hashes else None
+            commit_hash = header.parent_hashes[0] if header.parent_hashes else None
             count += 1
 
 
-    def build_index_from_tree(self, tree_hash: str, prefix: str = ""):
-        index = {}
-        try:
-            tree_obj = self.load_object(tree_hash)
-            tree = Tree.from_content(tree_obj.content)
-            for mode, name, obj_hash in tree.entries:
-                full_name = f"{prefix}{name}"
-                if mode.startswith("100"):
-                    index[full_name] = obj_hash
-                elif mode.startswith("400"):
-                    subindex = self.build_index_from_tree(obj_hash, f"{full_name}/")
-
-                    index.update(subindex)
-        except Exception as e:
-            print(f"Warning: Could not read tree {tree_hash}: {e}")
-
-        return index
-
+    def build_index_from_tree(self, tree_hash: bytes, prefix: str = ""):
+        return self._tree_blob_entries(tree_hash, prefix)
 
-    def get_all_files(self) -> List[Path]:
-        files = []
 
-        for item in self.path.rglob("*"):
-            if ".git" in item.parts:
-                continue
+    # iterative scandir walk; repository metadata dirs are pruned whole and
+    # DirEntry type checks and stat() are cached from the directory read
+    def _walk(self, root: Path):
+        stack = [root]
+        while stack:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in (".vc", ".git"):
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
 
-            if item.is_file():
-                files.append(item)
 
-        return files
+    def get_all_files(self) -> List[os.DirEntry]:
+        return list(self._walk(self.path))
 
 
     # status
@@ -444,19 +679,32 @@ class VersionControl:
                 commit_obj = self.load_object(current_commit_hash)
                 commit = Commit.from_content(commit_obj.content)
                 if commit.tree_hash:
-                    last_index_files = self.build_index_from_tree(commit.tree_hash)
+                    last_index_files = self.build_index_from_tree(
+                        bytes.fromhex(commit.tree_hash)
+                    )
             except:
                 last_index_files = {}
 
+        # working hashes are only compared against staged files, and a staged
+        # file whose stat still matches its index entry is not re-hashed; a
+        # size change is already a modification, so those get None too
         working_files = {}
         for item in self.get_all_files():
-            rel_path = str(item.relative_to(self.path))
+            rel_path = os.path.relpath(item.path, self.path)
+            entry = index.get(rel_path)
 
             try:
-                content = item.read_bytes()
-                blob = Blob(content)
-                working_files[rel_path] = blob.hash()
-            except:
+                if entry is None:
+                    working_files[rel_path] = None
+                    continue
+                st = item.stat()
+                if self.index_entry(entry["hash"], st) == entry:
+                    working_files[rel_path] = entry["hash"]
+                elif entry.get("size", st.st_size) != st.st_size:
+                    working_files[rel_path] = None
+                else:
+                    working_files[rel_path] = self.file_hash(item.path, st.st_size)
+            except OSError:
                 continue
 
         staged_files = []
@@ -464,46 +712,52 @@ class VersionControl:
         untracked_files = []
         deleted_files = []
 
-        for file_path in set(index.keys()) | set(last_index_files.keys()):
-            index_hash = index.get(file_path)
-            last_index_hash = last_index_files.get(file_path)
+        # one pass over every known path; working_files maps untracked and
+        # size-changed files to None, so absence needs its own marker. Hashes
+        # are raw digests, whose == already bails out on the first byte
+        missing = object()
+        working_get = working_files.get
+        index_get = index.get
+        last_get = last_index_files.get
+        for file_path in sorted(working_files.keys() | index.keys() | last_index_files.keys()):
+            working_hash = working_get(file_path, missing)
+            entry = index_get(file_path)
+            last_index_hash = last_get(file_path)
+
+            if entry is None:
+                if working_hash is not missing and last_index_hash is None:
+                    untracked_files.append(file_path)
+                continue
 
-            if index_hash and not last_index_hash:
+            index_hash = entry["hash"]
+            if not last_index_hash:
                 staged_files.append(("new file", file_path))
-            elif index_hash and last_index_hash and index_hash != last_index_hash:
+            elif index_hash != last_index_hash:
                 staged_files.append(("modified", file_path))
 
+            if working_hash is missing:
+                deleted_files.append(file_path)
+            elif working_hash != index_hash:
+                unstaged_files.append(file_path)
+
         if staged_files:
             print("\nChanges to be committed:")
             for stage_status, file_path in sorted(staged_files):
                 print(f"   {stage_status}: {file_path}")
 
-        for file_path in working_files:
-            if file_path in index:
-                if working_files[file_path] != index[file_path]:
-                    unstaged_files.append(file_path)
-
         if unstaged_files:
             print("\nChanges not staged for commit:")
-            for file_path in sorted(unstaged_files):
+            for file_path in unstaged_files:
                 print(f"   modified: {file_path}")
 
-        for file_path in working_files:
-            if file_path not in index and file_path not in last_index_files:
-                untracked_files.append(file_path)
-
         if untracked_files:
             print("\nUntracked files:")
-            for file_path in sorted(untracked_files):
+            for file_path in untracked_files:
                 print(f"   {file_path}")
 
-        for file_path in index:
-            if file_path not in working_files:
-                deleted_files.append(file_path)
-
         if deleted_files:
             print("\nDeleted files:")
-            for file_path in sorted(deleted_files):
+            for file_path in deleted_files:
                 print(f"   deleted: {file_path}")
 
         if (
@@ -1,77 +1,226 @@
 from __future__ import annotations
 
-import time, hashlib, zlib
+import os, re, time, hashlib, mmap, zlib, enum, bisect
 
-from typing import Tuple, List
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Tuple, List, NamedTuple
+
+CHUNK_SIZE = 1 << 20
+
+# compressed objects below this are inflated whole and sliced; the header
+# probe in deserialize only pays off once the payload copy would be large
+SMALL_OBJECT_SIZE = 64 << 10
 
 class VCObject:
     def __init__(self, obj_type: str, content: bytes):
         self.obj_type = obj_type
         self.content = content
+        self._hash = None
         
+    # the header size and the payload must come from the same read
+    @contextmanager
+    def _data(self):
+        yield self.content
+
+    def _header(self, size: int) -> bytes:
+        return f"{self.obj_type} {size}\0".encode()
+
+    # raw 20-byte sha1, as stored in trees and the index
+    def digest(self) -> bytes:
+        if self._hash is None:
+            with self._data() as buf:
+                hasher = hashlib.sha1(self._header(len(buf)))
+                hasher.update(buf)
+            self._hash = hasher.digest()
+        return self._hash
+
     def hash(self) -> str:
-        header = f"{self.obj_type} {len(self.content)}\0".encode()
-        return hashlib.sha1(header + self.content).hexdigest()
+        return self.digest().hex()
     
     def serialize(self) -> bytes:
-        header = f"{self.obj_type} {len(self.content)}\0".encode()
-        return zlib.compress(header + self.content)
+        parts = []
+        self.write_to(parts.append)
+        return b"".join(parts)
+
+    # compresses into write() and hashes in the same pass, chunk by chunk,
+    # so the digest kept is of exactly the bytes written
+    def write_to(self, write) -> bytes:
+        compressor = zlib.compressobj()
+        with self._data() as buf:
+            header = self._header(len(buf))
+            hasher = hashlib.sha1(header)
+            write(compressor.compress(header))
+
+            for offset in range(0, len(buf), CHUNK_SIZE):
+                chunk = buf[offset : offset + CHUNK_SIZE]
+                hasher.update(chunk)
+                write(compressor.compress(chunk))
+
+        write(compressor.flush())
+        self._hash = hasher.digest()
+        return self._hash
 
     @classmethod
     def deserialize(cls, data: bytes) -> VCObject:
-        decompressed = zlib.decompress(data)
-        null_idx = decompressed.find(b"\0")
-        header = decompressed[:null_idx].decode()
-        content = decompressed[null_idx + 1 :]
+        if len(data) < SMALL_OBJECT_SIZE:
+            raw = zlib.decompress(data)
+            nul = raw.find(b"\0")
+            if nul < 0:
+                raise ValueError("Object header is not terminated")
+            return cls(raw[: raw.index(b" ")].decode(), raw[nul + 1 :])
+
+        decompressor = zlib.decompressobj()
+        view = memoryview(data)
+
+        # a throwaway copy inflates the first few input bytes to find where
+        # the header ends; the real decompressor then stops exactly there,
+        # so the payload is inflated in one call into its own buffer
+        probe = decompressor.copy()
+        head = b""
+        pos = 0
+        while b"\0" not in head:
+            if pos >= len(view):
+                raise ValueError("Object header is not terminated")
+            head += probe.decompress(view[pos : pos + 64])
+            pos += 64
 
-        obj_type, _ = header.split(" ")
+        header = decompressor.decompress(view[:pos], head.index(b"\0") + 1)
+        consumed = min(pos, len(view)) - len(decompressor.unconsumed_tail)
+
+        obj_type = header[: header.index(b" ")].decode()
+        content = decompressor.decompress(view[consumed:]) + decompressor.flush()
         return cls(obj_type, content)
 
 
 class Blob(VCObject):
-    def __init__(self, content: bytes):
+    def __init__(self, content: bytes | Path):
+        self.path = None
+        if isinstance(content, Path):
+            self.path = content
+            content = None
+
         super().__init__("blob", content)
 
+    @contextmanager
+    def _data(self):
+        if self.path is None:
+            yield self.content
+            return
+
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b""
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+
+
+class Mode(enum.IntEnum):
+    TREE = 0o40000
+    BLOB = 0o100644
+    EXEC = 0o100755
+    SYMLINK = 0o120000
+
+
+# parsed modes share the enum members instead of one int per entry
+_MODES = {b"%o" % mode: mode for mode in Mode}
+
+
+# one match per "<mode> <name>\0<20-byte hash>" entry; findall runs the
+# whole scan in C, leaving Python only the per-entry tuple
+_TREE_ENTRY = re.compile(rb"(\d+) ([^\0]*)\0(.{20})", re.DOTALL)
+
+
+# serialization order: octal mode text, which keeps files ahead of trees, then name
+def _entry_key(entry: Tuple[int, str, bytes]) -> Tuple[bytes, str]:
+    return b"%o" % entry[0], entry[1]
+
 
 class Tree(VCObject):
-    def __init__(self, entries: List[Tuple[str, str, str]] = None):
-        self.entries = entries or []
-        
-        content = self._serialize_entries()
-        
-        super().__init__("tree", content)
+    # entries are (mode, name, raw 20-byte hash) with mode an int, usually a
+    # Mode; add_entry appends and they are put in serialization order once,
+    # the next time entries or content is read
+    def __init__(self, entries: List[Tuple[int, str, bytes]] = None):
+        self._entries = list(entries) if entries else []
+        self._sorted = not self._entries
+        self._names = None
+
+        # serialized on first use; add_entry resets it instead of re-serializing
+        super().__init__("tree", None)
+
+    @property
+    def entries(self) -> List[Tuple[int, str, bytes]]:
+        if not self._sorted:
+            self._entries.sort(key=_entry_key)
+            self._sorted = True
+        return self._entries
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = self._serialize_entries()
+        return self._content
+
+    @content.setter
+    def content(self, content: bytes):
+        self._content = content
+        self._hash = None
 
     def _serialize_entries(self) -> bytes:
-        content = b""
-        for mode, name, obj_hash in sorted(self.entries):
-            content += f"{mode} {name}\0".encode()
-            content += bytes.fromhex(obj_hash)
-        return content
+        parts = []
+        for mode, name, obj_hash in self.entries:
+            parts.append(b"%o %s\0" % (mode, name.encode()))
+            parts.append(obj_hash)
+        return b"".join(parts)
 
-    def add_entry(self, mode: str, name: str, obj_hash: str):
-        self.entries.append((mode, name, obj_hash))
-        self.content = self._serialize_entries()
+    def add_entry(self, mode: int, name: str, obj_hash: bytes):
+        self._entries.append((mode, name, obj_hash))
+        self._sorted = False
+        self._names = None
+        self._content = None
+        self._hash = None
+
+    # looks up one entry by name in O(log E), for walking a path a component
+    # at a time without scanning every entry of each tree on the way. Mode
+    # sorts first in serialization order, so names get their own sorted view,
+    # built on the first find after a change
+    def find(self, name: str) -> Tuple[int, str, bytes] | None:
+        if self._names is None:
+            self._names = sorted((entry[1], entry) for entry in self._entries)
+
+        i = bisect.bisect_left(self._names, (name,))
+        if i < len(self._names) and self._names[i][0] == name:
+            return self._names[i][1]
+        return None
 
     @classmethod
     def from_content(cls, content: bytes) -> Tree:
         tree = cls()
-        i = 0
+        modes_get = _MODES.get
 
-        while i < len(content):
-            null_idx = content.find(b"\0", i)
-            if null_idx == -1:
-                break
-            
-            mode_name = content[i:null_idx].decode()
-            mode, name = mode_name.split(" ", 1)
-            obj_hash = content[null_idx + 1 : null_idx + 21].hex()
-            tree.entries.append((mode, name, obj_hash))
-
-            i = null_idx + 21
+        # only the name is decoded; entries come out in serialization order
+        tree._entries = [
+            (modes_get(mode) or int(mode, 8), name.decode(), obj_hash)
+            for mode, name, obj_hash in _TREE_ENTRY.findall(content)
+        ]
+        tree._sorted = True
 
+        # the parsed bytes are already the canonical serialization
+        tree.content = content
         return tree
 
 
+class CommitHeader(NamedTuple):
+    tree_hash: str
+    parent_hashes: List[str]
+    author: str
+    committer: str
+    timestamp: int
+    message_offset: int
+
+
 class Commit(VCObject):
     def __init__(
         self,
@@ -89,8 +238,19 @@ class Commit(VCObject):
         self.message = message
         self.timestamp = timestamp or int(time.time())
 
-        content = self._serialize_commit()
-        super().__init__("commit", content)
+        # serialized on first use, like Tree
+        super().__init__("commit", None)
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = self._serialize_commit()
+        return self._content
+
+    @content.setter
+    def content(self, content: bytes):
+        self._content = content
+        self._hash = None
 
     def _serialize_commit(self):
         lines = [f"tree {self.tree_hash}"]
@@ -104,35 +264,64 @@ class Commit(VCObject):
 
         return "\n".join(lines).encode()
 
-    @classmethod
-    def from_content(cls, content: bytes) -> Commit:
-        lines = content.decode().split("\n")
+    # only the header lines are decoded; the message is left in content
+    # from message_offset on, for callers that need it
+    @staticmethod
+    def parse_header(content: bytes) -> CommitHeader:
         tree_hash = None
         parent_hashes = []
         author = None
         committer = None
-        message_start = 0
+        timestamp = None
+        message_offset = 0
 
-        for i, line in enumerate(lines):
-            if line.startswith("tree "):
-                tree_hash = line[5:]
+        # prefixes are matched in place, so only the fields themselves are
+        # sliced out and decoded
+        find = content.find
+        startswith = content.startswith
+        size = len(content)
+        pos = 0
+        while True:
+            end = find(b"\n", pos)
+            if end == -1:
+                end = size
 
-            elif line.startswith("parent "):
-                parent_hashes.append(line[7:])
-            
-            elif line.startswith("author "):
-                author_parts = line[7:].rsplit(" ", 2)
+            if startswith(b"tree ", pos, end):
+                tree_hash = content[pos + 5 : end].decode()
+
+            elif startswith(b"parent ", pos, end):
+                parent_hashes.append(content[pos + 7 : end].decode())
+
+            elif startswith(b"author ", pos, end):
+                author_parts = content[pos + 7 : end].decode().rsplit(" ", 2)
                 author = author_parts[0]
                 timestamp = int(author_parts[1])
 
-            elif line.startswith("committer "):
-                committer_parts = line[10:].rsplit(" ", 2)
+            elif startswith(b"committer ", pos, end):
+                committer_parts = content[pos + 10 : end].decode().rsplit(" ", 2)
                 committer = committer_parts[0]
-            
-            elif line == "":
-                message_start = i + 1
+
+            elif end == pos:
+                message_offset = min(end + 1, size)
+                break
+
+            if end == size:
                 break
+            pos = end + 1
 
-        message = "\n".join(lines[message_start:])
-        commit = cls(tree_hash, parent_hashes, author, committer, message, timestamp)
+        return CommitHeader(tree_hash, parent_hashes, author, committer, timestamp, message_offset)
+
+    @classmethod
+    def from_content(cls, content: bytes) -> Commit:
+        header = cls.parse_header(content)
+        message = content[header.message_offset:].decode()
+        commit = cls(
+            header.tree_hash,
+            header.parent_hashes,
+            header.author,
+            header.committer,
+            message,
+            header.timestamp,
+        )
+        commit.content = content
         return commit